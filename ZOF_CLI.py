@@ -2,44 +2,79 @@
 """
 ZOF_CLI.py
 Zero of Functions (ZOF) Solver - CLI
-Supports: Bisection, Regula Falsi, Secant, Newton-Raphson, Fixed Point, Modified Secant
-Requires: sympy, numpy
+Supports: Brent, Bisection, Regula Falsi, Secant, Newton-Raphson, Fixed Point, Modified Secant, Halley, Steffensen
+Requires: sympy, numpy (numba optional, used for the iterative methods)
 """
 
 import sys
 import math
-from sympy import sympify, Symbol, lambdify, diff
+from sympy import Symbol, lambdify
 import numpy as np
+from zof_jit import (MAX_ITERATIONS, parse_expression, scalar_function, jit_function, jit_derivatives, run_kernel, newton_kernel, secant_kernel,
+                     fixed_point_kernel, modified_secant_kernel, halley_kernel,
+                     steffensen_kernel, brent_kernel)
 
 x = Symbol('x')
 
 def parse_function(expr_str):
     try:
-        expr = sympify(expr_str)
-        f = lambdify(x, expr, 'numpy')
+        expr = parse_expression(expr_str)
+        f = scalar_function(expr)
         return expr, f
     except Exception as e:
         print("Error parsing function:", e)
         return None, None
 
+# one row per iteration; a, b hold the bracket the step started from
+ITER_DTYPE = [('k', 'i4'), ('x', 'f8'), ('fx', 'f8'), ('err', 'f8'), ('a', 'f8'), ('b', 'f8')]
+
 def print_iter_header():
     print(f"{'k':>3} | {'x_k':>18} | {'f(x_k)':>18} | {'error':>12} | extra")
     print("-"*70)
 
-def bisection(f, a, b, tol, maxit):
-    fa, fb = f(a), f(b)
-    if np.isnan(fa) or np.isnan(fb):
+def print_iter_table(ks, xs, fxs, errs, extras):
+    # rows are formatted after the solver finishes and written in one print
+    print_iter_header()
+    print("\n".join(f"{k:3d} | {xk:18.10f} | {fk:18.10e} | {ek:12.4e} | {ex}"
+                    for k, xk, fk, ek, ex in zip(ks, xs, fxs, errs, extras)))
+
+def _bisection_steps(f, a, b, tol, maxit, f_array, log):
+    fa, fb = float(f(a)), float(f(b))
+    if fa != fa or fb != fb:
         raise ValueError("Function returned NaN on interval endpoints.")
     if fa*fb > 0:
         raise ValueError("f(a) and f(b) must have opposite signs for bisection.")
-    print_iter_header()
-    c = a
-    for k in range(1, maxit+1):
+    c, fc = a, fa
+    k0 = 1
+    if f_array is not None and maxit > 6 and abs(b-a)/128.0 >= tol:
+        # the 65 points any of the first 6 midpoints can land on, built by the same
+        # (a + b)/2 halving as the loop below so the midpoints match it bit for bit;
+        # one vectorized call of f on them replays those 6 halvings (f itself equal
+        # up to rounding: numpy's array functions can differ from math in the last bit)
+        xs = np.empty(65)
+        xs[0], xs[64] = a, b
+        for s in (32, 16, 8, 4, 2, 1):
+            xs[s::2*s] = (xs[:-s:2*s] + xs[2*s::2*s])/2.0
+        ys = np.broadcast_to(f_array(xs), xs.shape)
+        lo, hi = 0, 64
+        for k in range(1, 7):
+            mid = (lo + hi)//2
+            c, fc = float(xs[mid]), float(ys[mid])
+            err = abs(b-a)/2.0
+            log[k-1] = (k, c, fc, err, a, b)
+            if fc == 0.0:
+                return c, fc, k
+            if fa*fc < 0:
+                hi, b, fb = mid, c, fc
+            else:
+                lo, a, fa = mid, c, fc
+        k0 = 7
+    for k in range(k0, maxit+1):
         c = (a + b)/2.0
-        fc = f(c)
+        fc = float(f(c))
         err = abs(b-a)/2.0
-        print(f"{k:3d} | {c:18.10f} | {fc:18.10e} | {err:12.4e} | interval=[{a:.6g},{b:.6g}]")
-        if abs(fc) == 0 or err < tol:
+        log[k-1] = (k, c, fc, err, a, b)
+        if fc == 0.0 or err < tol:
             return c, fc, k
         if fa*fc < 0:
             b = c
@@ -49,17 +84,37 @@ def bisection(f, a, b, tol, maxit):
             fa = fc
     return c, fc, maxit
 
-def regula_falsi(f, a, b, tol, maxit):
-    fa, fb = f(a), f(b)
+def bisection(f, a, b, tol, maxit, f_array=None):
+    log = np.empty(maxit, dtype=ITER_DTYPE)
+    c, fc, its = _bisection_steps(f, a, b, tol, maxit, f_array, log)
+    log = log[:its]
+    print_iter_table(log['k'], log['x'], log['fx'], log['err'],
+                     (f"interval=[{a:.6g},{b:.6g}]" for a, b in zip(log['a'], log['b'])))
+    return c, fc, its
+
+BRENT_STEPS = ("bisection", "secant", "inverse quadratic")
+
+def brent(f, a, b, tol, maxit):
+    xs, fxs, errs, steps, its, root, froot = run_kernel(brent_kernel, f, float(a), float(b), tol, maxit)
+    print_iter_table(range(1, its+1), xs, fxs, errs, (BRENT_STEPS[s] for s in steps[:its]))
+    return root, froot, its
+
+def _regula_falsi_steps(f, a, b, tol, maxit, log):
+    fa, fb = float(f(a)), float(f(b))
+    if fa != fa or fb != fb:
+        raise ValueError("Function returned NaN on interval endpoints.")
     if fa*fb > 0:
         raise ValueError("f(a) and f(b) must have opposite signs for Regula Falsi.")
-    print_iter_header()
-    c = a
+    c, fc = a, fa
     for k in range(1, maxit+1):
-        c = (a*fb - b*fa) / (fb - fa)
-        fc = f(c)
+        if math.isinf(fa) or math.isinf(fb):
+            # no secant through an infinite value (log(0), say): halve the bracket instead
+            c = (a + b)/2.0
+        else:
+            c = (a*fb - b*fa) / (fb - fa)
+        fc = float(f(c))
         err = abs(fc)
-        print(f"{k:3d} | {c:18.10f} | {fc:18.10e} | {err:12.4e} | a={a:.6g}, b={b:.6g}")
+        log[k-1] = (k, c, fc, err, a, b)
         if abs(fc) < tol:
             return c, fc, k
         if fa*fc < 0:
@@ -70,69 +125,60 @@ def regula_falsi(f, a, b, tol, maxit):
             fa = fc
     return c, fc, maxit
 
+def regula_falsi(f, a, b, tol, maxit):
+    log = np.empty(maxit, dtype=ITER_DTYPE)
+    c, fc, its = _regula_falsi_steps(f, a, b, tol, maxit, log)
+    log = log[:its]
+    print_iter_table(log['k'], log['x'], log['fx'], log['err'],
+                     (f"a={a:.6g}, b={b:.6g}" for a, b in zip(log['a'], log['b'])))
+    return c, fc, its
+
 def secant(f, x0, x1, tol, maxit):
-    print_iter_header()
-    f0, f1 = f(x0), f(x1)
-    for k in range(1, maxit+1):
-        if (f1 - f0) == 0:
-            raise ZeroDivisionError("Division by zero in Secant method.")
-        x2 = x1 - f1*(x1-x0)/(f1 - f0)
-        err = abs(x2 - x1)
-        fx2 = f(x2)
-        print(f"{k:3d} | {x2:18.10f} | {fx2:18.10e} | {err:12.4e} | x0={x0:.6g}, x1={x1:.6g}")
-        if err < tol or abs(fx2) < tol:
-            return x2, fx2, k
-        x0, f0 = x1, f1
-        x1, f1 = x2, fx2
-    return x2, fx2, maxit
-
-def newton_raphson(f, df, x0, tol, maxit):
-    print_iter_header()
-    xi = x0
-    for k in range(1, maxit+1):
-        fxi = f(xi)
-        dfxi = df(xi)
-        if dfxi == 0:
-            raise ZeroDivisionError("Zero derivative encountered in Newton-Raphson.")
-        x_next = xi - fxi/dfxi
-        err = abs(x_next - xi)
-        print(f"{k:3d} | {x_next:18.10f} | {f(x_next):18.10e} | {err:12.4e} | f'={dfxi:.6g}")
-        if err < tol or abs(f(x_next)) < tol:
-            return x_next, f(x_next), k
-        xi = x_next
-    return xi, f(xi), maxit
+    xs, fxs, errs, its = run_kernel(secant_kernel, f, float(x0), float(x1), tol, maxit)
+    prev = [x0, x1] + list(xs[:its])
+    print_iter_table(range(1, its+1), xs, fxs, errs,
+                     (f"x0={prev[k]:.6g}, x1={prev[k+1]:.6g}" for k in range(its)))
+    if its == 0:
+        return x1, f(x1), 0
+    return xs[its-1], fxs[its-1], its
+
+def newton_raphson(fd, x0, tol, maxit, complex_roots=False):
+    x0 = complex(x0) if complex_roots else float(x0)
+    xs, fxs, errs, dfs, its = run_kernel(newton_kernel, fd, x0, tol, maxit)
+    print_iter_table(range(1, its+1), xs, fxs, errs, (f"f'={d:.6g}" for d in dfs))
+    if its == 0:
+        return x0, fd(x0)[0], 0
+    return xs[its-1], fxs[its-1], its
+
+def halley(fdd, x0, tol, maxit, complex_roots=False):
+    x0 = complex(x0) if complex_roots else float(x0)
+    xs, fxs, errs, dfs, its = run_kernel(halley_kernel, fdd, x0, tol, maxit)
+    print_iter_table(range(1, its+1), xs, fxs, errs, (f"f'={d:.6g}" for d in dfs))
+    if its == 0:
+        return x0, fdd(x0)[0], 0
+    return xs[its-1], fxs[its-1], its
 
 def fixed_point(g, x0, tol, maxit):
-    print_iter_header()
-    xi = x0
-    for k in range(1, maxit+1):
-        x_next = g(xi)
-        err = abs(x_next - xi)
-        try:
-            gx = g(x_next)
-        except Exception:
-            gx = float('nan')
-        print(f"{k:3d} | {x_next:18.10f} | {gx:18.10e} | {err:12.4e} | g(x) used")
-        if err < tol:
-            return x_next, gx, k
-        xi = x_next
-    return xi, g(xi), maxit
-
-def modified_secant(f, x0, delta, tol, maxit):
-    print_iter_header()
-    xi = x0
-    for k in range(1, maxit+1):
-        perturb = x0 * delta if x0 != 0 else delta
-        denom = f(xi + perturb) - f(xi)
-        if denom == 0:
-            raise ZeroDivisionError("Denominator zero in Modified Secant.")
-        x_next = xi - f(xi) * perturb / denom
-        err = abs(x_next - xi)
-        print(f"{k:3d} | {x_next:18.10f} | {f(x_next):18.10e} | {err:12.4e} | delta={delta}")
-        if err < tol or abs(f(x_next)) < tol:
-            return x_next, f(x_next), k
-        xi = x_next
-    return xi, f(xi), maxit
+    xs, gxs, errs, its = run_kernel(fixed_point_kernel, g, float(x0), tol, maxit)
+    print_iter_table(range(1, its+1), xs, gxs, errs, ["g(x) used"]*its)
+    if its == 0:
+        return x0, g(x0), 0
+    return xs[its-1], gxs[its-1], its
+
+def steffensen(g, x0, tol, maxit):
+    xs, gxs, errs, its = run_kernel(steffensen_kernel, g, float(x0), tol, maxit)
+    print_iter_table(range(1, its+1), xs, gxs, errs, ["Aitken step"]*its)
+    if its == 0:
+        return x0, g(x0), 0
+    return xs[its-1], gxs[its-1], its
+
+def modified_secant(f, x0, delta, tol, maxit, central=False):
+    xs, fxs, errs, its = run_kernel(modified_secant_kernel, f, float(x0), delta, tol, maxit, central)
+    note = f"delta={delta}" + (", central" if central else "")
+    print_iter_table(range(1, its+1), xs, fxs, errs, [note]*its)
+    if its == 0:
+        return x0, f(x0), 0
+    return xs[its-1], fxs[its-1], its
 
 def get_float(prompt, default=None):
     while True:
@@ -144,25 +190,37 @@ def get_float(prompt, default=None):
         except:
             print("Enter a valid number.")
 
+def get_start(prompt):
+    # a 'j' in the input (Python syntax, e.g. 1+2j) asks for a complex root
+    while True:
+        s = input(prompt).strip().replace(" ", "")
+        try:
+            return complex(s) if "j" in s else float(s)
+        except ValueError:
+            print("Enter a valid number.")
+
 def main():
     print("ZOF_CLI - Zero of Functions Solver")
-    print("Enter function in variable x (example: x**3 - 2*x - 5). Use Python syntax.")
+    print("Enter function in variable x (example: x**3 - 2*x - 5). Use Python syntax; ^ also means power.")
     func_str = input("f(x) = ").strip()
     expr, f = parse_function(func_str)
     if f is None:
         return
-    # derivative for Newton
-    df_expr = diff(expr, x)
-    df = lambdify(x, df_expr, 'numpy')
+    f_array = lambdify(x, expr, 'numpy', cse=True)
+    # compiled f for the kernel-based methods
+    fj = jit_function(expr)
 
     print("\nChoose method:")
-    print("1) Bisection")
+    print("1) Brent (bracketing; interpolation with bisection safeguard)")
     print("2) Regula Falsi (False Position)")
     print("3) Secant")
     print("4) Newton-Raphson")
     print("5) Fixed Point Iteration (requires g(x))")
     print("6) Modified Secant")
-    choice = input("Choice (1-6): ").strip()
+    print("7) Halley")
+    print("8) Steffensen (accelerated Fixed Point, requires g(x))")
+    print("9) Bisection")
+    choice = input("Choice (1-9): ").strip()
     try:
         choice = int(choice)
     except:
@@ -170,12 +228,18 @@ def main():
 
     tol = get_float("Tolerance (default 1e-8): ", 1e-8)
     maxit = int(get_float("Max iterations (default 50): ", 50))
+    if not 0 <= maxit <= MAX_ITERATIONS:
+        print(f"Max iterations must be between 0 and {MAX_ITERATIONS}."); return
 
     try:
         if choice == 1:
             a = get_float("a = ")
             b = get_float("b = ")
-            root, froot, iterations = bisection(f, a, b, tol, maxit)
+            root, froot, iterations = brent(fj, a, b, tol, maxit)
+        elif choice == 9:
+            a = get_float("a = ")
+            b = get_float("b = ")
+            root, froot, iterations = bisection(f, a, b, tol, maxit, f_array)
         elif choice == 2:
             a = get_float("a = ")
             b = get_float("b = ")
@@ -183,22 +247,38 @@ def main():
         elif choice == 3:
             x0 = get_float("x0 = ")
             x1 = get_float("x1 = ")
-            root, froot, iterations = secant(f, x0, x1, tol, maxit)
+            root, froot, iterations = secant(fj, x0, x1, tol, maxit)
         elif choice == 4:
-            x0 = get_float("initial x0 = ")
-            root, froot, iterations = newton_raphson(f, df, x0, tol, maxit)
+            x0 = get_start("initial x0 (complex like 1+1j for complex roots) = ")
+            cplx = isinstance(x0, complex)
+            root, froot, iterations = newton_raphson(jit_derivatives(expr, 1, cplx), x0, tol, maxit, cplx)
         elif choice == 5:
             print("Enter g(x) for Fixed Point iteration (x_{n+1} = g(x_n)).")
             g_str = input("g(x) = ").strip()
             g_expr, g_func = parse_function(g_str)
             if g_func is None:
                 return
+            g_func = jit_function(g_expr)
             x0 = get_float("initial x0 = ")
             root, froot, iterations = fixed_point(g_func, x0, tol, maxit)
         elif choice == 6:
             x0 = get_float("initial x0 = ")
             delta = get_float("delta (perturbation fraction, e.g. 1e-3): ", 1e-3)
-            root, froot, iterations = modified_secant(f, x0, delta, tol, maxit)
+            central = input("Central difference derivative? (y/N): ").strip().lower() == "y"
+            root, froot, iterations = modified_secant(fj, x0, delta, tol, maxit, central)
+        elif choice == 7:
+            x0 = get_start("initial x0 (complex like 1+1j for complex roots) = ")
+            cplx = isinstance(x0, complex)
+            root, froot, iterations = halley(jit_derivatives(expr, 2, cplx), x0, tol, maxit, cplx)
+        elif choice == 8:
+            print("Enter g(x) for Steffensen iteration (fixed point x = g(x)).")
+            g_str = input("g(x) = ").strip()
+            g_expr, g_func = parse_function(g_str)
+            if g_func is None:
+                return
+            g_func = jit_function(g_expr)
+            x0 = get_float("initial x0 = ")
+            root, froot, iterations = steffensen(g_func, x0, tol, maxit)
         else:
             print("Invalid choice."); return
     except Exception as e:
@@ -1,165 +1,625 @@
-from flask import Flask, render_template, request, redirect, url_for
-from sympy import sympify, Symbol, lambdify, diff
+import os
+import re
+import math
+import time
+import json
+import uuid
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from flask import Flask, render_template, request, redirect, url_for, jsonify
+from sympy import Symbol, lambdify, Poly
 import numpy as np
+try:
+    import cupy
+    HAVE_CUPY = True
+except Exception:
+    HAVE_CUPY = False
+from zof_jit import (MAX_ITERATIONS, parse_expression, scalar_function, jit_function, jit_derivatives, run_kernel, newton_kernel, secant_kernel,
+                     fixed_point_kernel, modified_secant_kernel, halley_kernel,
+                     halley_fixed_kernel, steffensen_kernel, brent_kernel)
 
 app = Flask(__name__)
 x = Symbol('x')
 
+# Large /batch requests are split into chunks solved on a thread pool; numpy
+# releases the GIL inside the ufunc loops, so chunks overlap. Threads start
+# lazily on first submit, so gunicorn's --preload fork happens before any exist.
+BATCH_CHUNK = 65536
+_batch_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# Parsing and code generation cost far more than the iterations for a cheap f,
+# so compiled callables are cached per expression string across requests.
+# The scalar solvers get a math-module f (plain floats, no ufunc dispatch);
+# the numpy one is kept for the vectorized batch solvers.
+@lru_cache(maxsize=512)
+def _compile(expr_str):
+    expr = parse_expression(expr_str)
+    return expr, scalar_function(expr), lambdify(x, expr, modules=['numpy'], cse=True)
+
+# f together with its first `order` derivatives from a single call (Newton: 1, Halley: 2)
+@lru_cache(maxsize=512)
+def _compile_derivs(expr_str, order, complex_roots=False):
+    return jit_derivatives(_compile(expr_str)[0], order, complex_roots)
+
+# batches larger than this go to the GPU when CuPy is installed and finds a device
+GPU_BATCH_MIN = 100000
+
+# Importing cupy works without a GPU, so the device is probed on first use instead.
+# Not at import: with preload_app that would start CUDA in the gunicorn master,
+# and a CUDA context does not survive the fork into the workers.
+@lru_cache(maxsize=None)
+def _have_gpu():
+    try:
+        return cupy.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        return False
+
+@lru_cache(maxsize=64)
+def _compile_cupy(expr_str):
+    """f for the vectorized solvers on CuPy arrays; polynomials go through cupy.polyval."""
+    expr = _compile(expr_str)[0]
+    if expr.is_polynomial(x) and not expr.free_symbols - {x}:
+        coeffs = cupy.asarray([float(c) for c in Poly(expr, x).all_coeffs()])
+        return lambda xs: cupy.polyval(coeffs, xs)
+    return lambdify(x, expr, 'cupy')
+
 def parse_function(expr_str):
-    expr = sympify(expr_str)
-    f = lambdify(x, expr, 'numpy')
-    return expr, f
+    expr, f_scalar, f_array = _compile(expr_str)
+    return expr, f_scalar
+
+class IterLog:
+    """Iteration history as parallel arrays, one per table column.
+
+    The notes column is a format string applied to per-row argument arrays,
+    so its text is only built when the table is rendered. Iterating yields
+    (k, x_k, f(x_k), error, note) rows for the template.
+    """
+
+    def __init__(self, xs, fxs, errs, note="", note_args=()):
+        self.xs = np.asarray(xs)
+        self.fxs = np.asarray(fxs)
+        self.errs = np.asarray(errs)
+        self.note = note
+        self.note_args = tuple(np.asarray(a) for a in note_args)
+
+    def __len__(self):
+        return len(self.xs)
+
+    def notes(self):
+        if not self.note_args:
+            return [self.note] * len(self)
+        return [self.note.format(*row) for row in zip(*(a.tolist() for a in self.note_args))]
+
+    def __iter__(self):
+        return zip(range(1, len(self)+1), self.xs.tolist(), self.fxs.tolist(),
+                   self.errs.tolist(), self.notes())
+
+    def to_dict(self):
+        return {'xs': self.xs.tolist(), 'fxs': self.fxs.tolist(), 'errs': self.errs.tolist(),
+                'note': self.note, 'note_args': [a.tolist() for a in self.note_args]}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['xs'], d['fxs'], d['errs'], d['note'], d['note_args'])
+
+# one row per iteration; a, b hold the bracket the step started from
+ITER_DTYPE = [('k', 'i4'), ('x', 'f8'), ('fx', 'f8'), ('err', 'f8'), ('a', 'f8'), ('b', 'f8')]
 
 # (Re-use the same numerical methods as CLI but return iteration list)
-def bisection_list(f, a, b, tol, maxit):
-    fa, fb = f(a), f(b)
+def _bisection_steps(f, a, b, tol, maxit, f_array, log):
+    fa, fb = float(f(a)), float(f(b))
+    if fa != fa or fb != fb:
+        raise ValueError("Function returned NaN on interval endpoints.")
     if fa*fb > 0:
         raise ValueError("f(a) and f(b) must have opposite signs for bisection.")
-    iters = []
-    for k in range(1, maxit+1):
+    c, fc = a, fa
+    k0 = 1
+    if f_array is not None and maxit > 6 and abs(b-a)/128.0 >= tol:
+        # the 65 points any of the first 6 midpoints can land on, built by the same
+        # (a + b)/2 halving as the loop below so the midpoints match it bit for bit;
+        # one vectorized call of f on them replays those 6 halvings (f itself equal
+        # up to rounding: numpy's array functions can differ from math in the last bit)
+        xs = np.empty(65)
+        xs[0], xs[64] = a, b
+        for s in (32, 16, 8, 4, 2, 1):
+            xs[s::2*s] = (xs[:-s:2*s] + xs[2*s::2*s])/2.0
+        ys = np.broadcast_to(f_array(xs), xs.shape)
+        lo, hi = 0, 64
+        for k in range(1, 7):
+            mid = (lo + hi)//2
+            c, fc = float(xs[mid]), float(ys[mid])
+            err = abs(b-a)/2.0
+            log[k-1] = (k, c, fc, err, a, b)
+            if fc == 0.0:
+                return c, fc, k
+            if fa*fc < 0:
+                hi, b, fb = mid, c, fc
+            else:
+                lo, a, fa = mid, c, fc
+        k0 = 7
+    for k in range(k0, maxit+1):
         c = (a + b)/2.0
-        fc = f(c)
+        fc = float(f(c))
         err = abs(b-a)/2.0
-        iters.append((k, c, fc, err, f"[{a},{b}]"))
-        if abs(fc) == 0 or err < tol:
-            return iters, c, fc, k
+        log[k-1] = (k, c, fc, err, a, b)
+        if fc == 0.0 or err < tol:
+            return c, fc, k
         if fa*fc < 0:
             b = c
             fb = fc
         else:
             a = c
             fa = fc
-    return iters, c, fc, maxit
+    return c, fc, maxit
 
-def regula_falsi_list(f, a, b, tol, maxit):
-    fa, fb = f(a), f(b)
+def bisection_list(f, a, b, tol, maxit, f_array=None):
+    log = np.empty(maxit, dtype=ITER_DTYPE)
+    c, fc, its = _bisection_steps(f, a, b, tol, maxit, f_array, log)
+    log = log[:its]
+    return IterLog(log['x'], log['fx'], log['err'], "[{0},{1}]", (log['a'], log['b'])), c, fc, its
+
+BRENT_STEPS = ("bisection", "secant", "inverse quadratic")
+
+def brent_list(f, a, b, tol, maxit):
+    xs, fxs, errs, steps, its, root, froot = run_kernel(brent_kernel, f, a, b, tol, maxit)
+    names = np.array(BRENT_STEPS)[steps[:its]]
+    return IterLog(xs[:its], fxs[:its], errs[:its], "{0}", (names,)), root, froot, its
+
+def _regula_falsi_steps(f, a, b, tol, maxit, log):
+    fa, fb = float(f(a)), float(f(b))
+    if fa != fa or fb != fb:
+        raise ValueError("Function returned NaN on interval endpoints.")
     if fa*fb > 0:
         raise ValueError("f(a) and f(b) must have opposite signs for Regula Falsi.")
-    iters = []
+    c, fc = a, fa
     for k in range(1, maxit+1):
-        c = (a*fb - b*fa) / (fb - fa)
-        fc = f(c)
+        if math.isinf(fa) or math.isinf(fb):
+            # no secant through an infinite value (log(0), say): halve the bracket instead
+            c = (a + b)/2.0
+        else:
+            c = (a*fb - b*fa) / (fb - fa)
+        fc = float(f(c))
         err = abs(fc)
-        iters.append((k, c, fc, err, f"a={a}, b={b}"))
+        log[k-1] = (k, c, fc, err, a, b)
         if abs(fc) < tol:
-            return iters, c, fc, k
+            return c, fc, k
         if fa*fc < 0:
             b = c
             fb = fc
         else:
             a = c
             fa = fc
-    return iters, c, fc, maxit
+    return c, fc, maxit
+
+def regula_falsi_list(f, a, b, tol, maxit):
+    log = np.empty(maxit, dtype=ITER_DTYPE)
+    c, fc, its = _regula_falsi_steps(f, a, b, tol, maxit, log)
+    log = log[:its]
+    return IterLog(log['x'], log['fx'], log['err'], "a={0}, b={1}", (log['a'], log['b'])), c, fc, its
 
 def secant_list(f, x0, x1, tol, maxit):
-    iters = []
-    f0, f1 = f(x0), f(x1)
-    for k in range(1, maxit+1):
-        if (f1 - f0) == 0:
-            raise ZeroDivisionError("Division by zero in Secant method.")
-        x2 = x1 - f1*(x1-x0)/(f1 - f0)
-        err = abs(x2 - x1)
-        fx2 = f(x2)
-        iters.append((k, x2, fx2, err, f"x0={x0}, x1={x1}"))
-        if err < tol or abs(fx2) < tol:
-            return iters, x2, fx2, k
-        x0, f0 = x1, f1
-        x1, f1 = x2, fx2
-    return iters, x2, fx2, maxit
-
-def newton_list(f, df, x0, tol, maxit):
-    iters = []
-    xi = x0
-    for k in range(1, maxit+1):
-        fxi = f(xi)
-        dfxi = df(xi)
-        if dfxi == 0:
-            raise ZeroDivisionError("Zero derivative in Newton.")
-        x_next = xi - fxi/dfxi
-        err = abs(x_next - xi)
-        iters.append((k, x_next, f(x_next), err, f"f'={dfxi}"))
-        if err < tol or abs(f(x_next)) < tol:
-            return iters, x_next, f(x_next), k
-        xi = x_next
-    return iters, xi, f(xi), maxit
+    xs, fxs, errs, its = run_kernel(secant_kernel, f, x0, x1, tol, maxit)
+    prev = np.concatenate(([x0, x1], xs[:its]))
+    iters = IterLog(xs[:its], fxs[:its], errs[:its], "x0={0}, x1={1}", (prev[:its], prev[1:its+1]))
+    if its == 0:
+        return iters, x1, f(x1), 0
+    return iters, xs[its-1], fxs[its-1], its
+
+def _start_value(s):
+    # a 'j' in x0 (Python syntax, e.g. 1+2j) asks Newton/Halley for a complex root
+    s = (s or '').replace(' ', '')
+    return complex(s) if 'j' in s else float(s)
+
+def newton_list(fd, x0, tol, maxit):
+    xs, fxs, errs, dfs, its = run_kernel(newton_kernel, fd, x0, tol, maxit)
+    iters = IterLog(xs[:its], fxs[:its], errs[:its], "f'={0}", (dfs[:its],))
+    if its == 0:
+        return iters, x0, fd(x0)[0], 0
+    return iters, xs[its-1], fxs[its-1], its
+
+def halley_list(fdd, x0, tol, maxit):
+    xs, fxs, errs, dfs, its = run_kernel(halley_kernel, fdd, x0, tol, maxit)
+    iters = IterLog(xs[:its], fxs[:its], errs[:its], "f'={0}", (dfs[:its],))
+    if its == 0:
+        return iters, x0, fdd(x0)[0], 0
+    return iters, xs[its-1], fxs[its-1], its
+
+def halley_fixed_list(fdd, x0):
+    xs, fxs, errs = run_kernel(halley_fixed_kernel, fdd, x0)
+    iters = IterLog(xs, fxs, errs, "{0}", (["Halley"]*3 + ["Newton"],))
+    return iters, xs[3], fxs[3], 4
 
 def fixed_point_list(g, x0, tol, maxit):
-    iters = []
-    xi = x0
+    xs, gxs, errs, its = run_kernel(fixed_point_kernel, g, x0, tol, maxit)
+    iters = IterLog(xs[:its], gxs[:its], errs[:its], "g(x)")
+    if its == 0:
+        return iters, x0, g(x0), 0
+    return iters, xs[its-1], gxs[its-1], its
+
+def steffensen_list(g, x0, tol, maxit):
+    xs, gxs, errs, its = run_kernel(steffensen_kernel, g, x0, tol, maxit)
+    iters = IterLog(xs[:its], gxs[:its], errs[:its], "Aitken step")
+    if its == 0:
+        return iters, x0, g(x0), 0
+    return iters, xs[its-1], gxs[its-1], its
+
+def modified_secant_list(f, x0, delta, tol, maxit, central=False):
+    xs, fxs, errs, its = run_kernel(modified_secant_kernel, f, x0, delta, tol, maxit, central)
+    note = f"delta={delta}" + (", central" if central else "")
+    iters = IterLog(xs[:its], fxs[:its], errs[:its], note)
+    if its == 0:
+        return iters, x0, f(x0), 0
+    return iters, xs[its-1], fxs[its-1], its
+
+# Vectorized solvers: one bracket per entry of a, b, all iterated together.
+# Converged entries are frozen with a boolean mask so one f call per
+# iteration serves the whole batch. They run in `dtype` (float32 by default,
+# half the memory traffic of float64) and return (root, froot, its, ok);
+# ok is False where that precision ran out before tol was met.
+def _feval(f, xs, xp=np):
+    # lambdify returns a plain scalar for constant expressions
+    return xp.broadcast_to(xp.asarray(f(xs), dtype=xs.dtype), xs.shape).copy()
+
+def bisection_vec(f, a, b, tol, maxit, dtype=np.float32, xp=np):
+    a = xp.array(a, dtype=dtype, ndmin=1)
+    b = xp.array(b, dtype=dtype, ndmin=1)
+    fa, fb = _feval(f, a, xp), _feval(f, b, xp)
+    if xp.any(fa*fb > 0):
+        raise ValueError("f(a) and f(b) must have opposite signs for bisection.")
+    c, fc = a.copy(), fa.copy()
+    its = xp.full(a.shape, maxit)
+    ok = xp.zeros(a.shape, dtype=bool)
+    active = xp.ones(a.shape, dtype=bool)
+    for k in range(1, maxit+1):
+        c = xp.where(active, 0.5*(a + b), c)
+        fc = xp.where(active, _feval(f, c, xp), fc)
+        err = 0.5*xp.abs(b - a)
+        done = active & ((err < tol) | (fc == 0))
+        ok |= done
+        # midpoint equal to an endpoint: no representable number left between them
+        stalled = active & ~done & ((c == a) | (c == b))
+        its[done | stalled] = k
+        active &= ~(done | stalled)
+        if not active.any():
+            break
+        left = active & (fa*fc < 0)
+        right = active & ~left
+        b = xp.where(left, c, b)
+        fb = xp.where(left, fc, fb)
+        a = xp.where(right, c, a)
+        fa = xp.where(right, fc, fa)
+    return c, fc, its, ok
+
+def regula_falsi_vec(f, a, b, tol, maxit, dtype=np.float32, xp=np):
+    a = xp.array(a, dtype=dtype, ndmin=1)
+    b = xp.array(b, dtype=dtype, ndmin=1)
+    fa, fb = _feval(f, a, xp), _feval(f, b, xp)
+    if xp.any(fa*fb > 0):
+        raise ValueError("f(a) and f(b) must have opposite signs for Regula Falsi.")
+    c, fc = a.copy(), fa.copy()
+    its = xp.full(a.shape, maxit)
+    ok = xp.zeros(a.shape, dtype=bool)
+    active = xp.ones(a.shape, dtype=bool)
     for k in range(1, maxit+1):
-        x_next = g(xi)
-        err = abs(x_next - xi)
-        iters.append((k, x_next, g(x_next) if callable(g) else None, err, "g(x)"))
-        if err < tol:
-            return iters, x_next, g(x_next), k
-        xi = x_next
-    return iters, xi, g(xi), maxit
-
-def modified_secant_list(f, x0, delta, tol, maxit):
-    iters = []
-    xi = x0
+        prev = c
+        with np.errstate(divide='ignore', invalid='ignore'):
+            c = xp.where(active, (a*fb - b*fa) / (fb - fa), c)
+        fc = xp.where(active, _feval(f, c, xp), fc)
+        done = active & (xp.abs(fc) < tol)
+        ok |= done
+        stalled = active & ~done & (c == prev)
+        its[done | stalled] = k
+        active &= ~(done | stalled)
+        if not active.any():
+            break
+        left = active & (fa*fc < 0)
+        right = active & ~left
+        b = xp.where(left, c, b)
+        fb = xp.where(left, fc, fb)
+        a = xp.where(right, c, a)
+        fa = xp.where(right, fc, fa)
+    return c, fc, its, ok
+
+def chandrupatla_vec(f, a, b, tol, maxit, dtype=np.float32, xp=np):
+    # Chandrupatla's method: inverse quadratic interpolation when the last three
+    # points say it is safe, bisection otherwise; simpler to mask than Brent.
+    # x1 is the newest point, [x1, x2] the bracket, x3 the point dropped last.
+    x2 = xp.array(a, dtype=dtype, ndmin=1)
+    x1 = xp.array(b, dtype=dtype, ndmin=1)
+    f2, f1 = _feval(f, x2, xp), _feval(f, x1, xp)
+    if xp.any(f1*f2 > 0):
+        raise ValueError("f(a) and f(b) must have opposite signs for Chandrupatla's method.")
+    x3, f3 = x1.copy(), f1.copy()
+    smaller = xp.abs(f1) < xp.abs(f2)
+    xm = xp.where(smaller, x1, x2)
+    fm = xp.where(smaller, f1, f2)
+    t = xp.full(x1.shape, 0.5, dtype=dtype)
+    its = xp.full(x1.shape, maxit)
+    active = fm != 0
+    its[~active] = 0
+    ok = ~active
+    eps = np.finfo(dtype).eps
     for k in range(1, maxit+1):
-        perturb = x0 * delta if x0 != 0 else delta
-        denom = f(xi + perturb) - f(xi)
-        if denom == 0:
-            raise ZeroDivisionError("Denominator zero in Modified Secant.")
-        x_next = xi - f(xi) * perturb / denom
-        err = abs(x_next - xi)
-        iters.append((k, x_next, f(x_next), err, f"delta={delta}"))
-        if err < tol or abs(f(x_next)) < tol:
-            return iters, x_next, f(x_next), k
-        xi = x_next
-    return iters, xi, f(xi), maxit
+        if not active.any():
+            break
+        xt = x1 + t*(x2 - x1)
+        ft = xp.where(active, _feval(f, xt, xp), f1)
+        same = active & (xp.sign(ft) == xp.sign(f1))
+        flip = active & ~same
+        x3 = xp.where(same, x1, xp.where(flip, x2, x3))
+        f3 = xp.where(same, f1, xp.where(flip, f2, f3))
+        x2 = xp.where(flip, x1, x2)
+        f2 = xp.where(flip, f1, f2)
+        x1 = xp.where(active, xt, x1)
+        f1 = xp.where(active, ft, f1)
+        smaller = xp.abs(f1) < xp.abs(f2)
+        xm = xp.where(active, xp.where(smaller, x1, x2), xm)
+        fm = xp.where(active, xp.where(smaller, f1, f2), fm)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tlim = (2*eps*xp.abs(xm) + 0.5*tol) / xp.abs(x2 - x1)
+            xi = (x1 - x2) / (x3 - x2)
+            phi = (f1 - f2) / (f3 - f2)
+            iqi = (phi**2 < xi) & ((1 - phi)**2 < 1 - xi)
+            t_iqi = (f1/(f2 - f1) * f3/(f2 - f3)
+                     + (x3 - x1)/(x2 - x1) * f1/(f3 - f1) * f2/(f3 - f2))
+        done = active & ((fm == 0) | (tlim > 0.5))
+        # the stopping width is 4*eps*|xm| + tol; if eps dominates, tol was not met
+        ok |= done & ((fm == 0) | (4*eps*xp.abs(xm) <= tol))
+        its[done] = k
+        active &= ~done
+        t = xp.clip(xp.where(iqi, t_iqi, 0.5), tlim, 1 - tlim)
+    return xm, fm, its, ok
+
+def _solve_promoting(solver, f, a, b, tol, maxit, dtype=np.float32, xp=np):
+    # solve in dtype, then redo only the entries it could not resolve in float64;
+    # a tol finer than dtype can represent over the brackets goes straight to float64
+    if a.size and tol < 4*np.finfo(dtype).eps*max(xp.abs(a).max(), xp.abs(b).max()):
+        dtype = np.float64
+    root, froot, its, ok = solver(f, a, b, tol, maxit, dtype, xp)
+    root, froot = root.astype(float), froot.astype(float)
+    redo = xp.flatnonzero(~ok)
+    if redo.size and np.dtype(dtype) != np.float64:
+        root[redo], froot[redo], its[redo], _ = solver(f, a[redo], b[redo], tol, maxit, np.float64, xp)
+    return root, froot, its
+
+def _plain(v):
+    return complex(v) if np.iscomplexobj(v) else float(v)
+
+def run_solver(form):
+    """Solve one web-form request; returns (result, error), picklable for the process pool."""
+    result = None
+    error = None
+    func_str = form.get('function')
+    method = form.get('method')
+    try:
+        tol = float(form.get('tolerance') or 1e-8)
+        maxit = int(form.get('maxit') or 50)
+        if not 0 <= maxit <= MAX_ITERATIONS:
+            raise ValueError(f"Max iterations must be between 0 and {MAX_ITERATIONS}.")
+        expr, f, f_array = _compile(func_str)
+        if method in ['brent', 'bisection', 'regulafalsi']:
+            a = float(form.get('a'))
+            b = float(form.get('b'))
+            if method == 'brent':
+                iters, root, froot, its = brent_list(jit_function(expr), a, b, tol, maxit)
+            elif method == 'bisection':
+                iters, root, froot, its = bisection_list(f, a, b, tol, maxit, f_array)
+            else:
+                iters, root, froot, its = regula_falsi_list(f, a, b, tol, maxit)
+        elif method == 'secant':
+            x0 = float(form.get('x0'))
+            x1 = float(form.get('x1'))
+            iters, root, froot, its = secant_list(jit_function(expr), x0, x1, tol, maxit)
+        elif method == 'newton':
+            x0 = _start_value(form.get('x0'))
+            fd = _compile_derivs(func_str, 1, isinstance(x0, complex))
+            iters, root, froot, its = newton_list(fd, x0, tol, maxit)
+        elif method in ['halley', 'halley_fixed']:
+            x0 = _start_value(form.get('x0'))
+            fdd = _compile_derivs(func_str, 2, isinstance(x0, complex))
+            if method == 'halley':
+                iters, root, froot, its = halley_list(fdd, x0, tol, maxit)
+            else:
+                iters, root, froot, its = halley_fixed_list(fdd, x0)
+        elif method in ['fixed', 'steffensen']:
+            g_str = form.get('gfunction')
+            g_expr, g = parse_function(g_str)
+            x0 = float(form.get('x0'))
+            if method == 'fixed':
+                iters, root, froot, its = fixed_point_list(jit_function(g_expr), x0, tol, maxit)
+            else:
+                iters, root, froot, its = steffensen_list(jit_function(g_expr), x0, tol, maxit)
+        elif method == 'modified_secant':
+            x0 = float(form.get('x0'))
+            delta = float(form.get('delta') or 1e-3)
+            central = bool(form.get('central'))
+            iters, root, froot, its = modified_secant_list(jit_function(expr), x0, delta, tol, maxit, central)
+        else:
+            raise ValueError("Unknown method")
+        result = {
+            'iters': iters,
+            'root': _plain(root),
+            'froot': _plain(froot),
+            'its': int(its),
+            'function': func_str,
+            'method': method
+        }
+    except Exception as e:
+        error = str(e)
+    return result, error
+
+# Background solving: POST /solve queues the form on a process pool and answers
+# 202 with a job id, GET /result/<id> is polled until it is done. Job state is
+# kept as JSON files in JOB_DIR so whichever gunicorn worker gets the poll can answer.
+JOB_DIR = os.environ.get('ZOF_JOB_DIR', os.path.join(tempfile.gettempdir(), 'zof_jobs'))
+# job files nobody collected are removed after this many seconds
+JOB_TTL = 3600
+# solver processes per gunicorn worker (or per dev server)
+SOLVER_PROCESSES = int(os.environ.get('ZOF_SOLVER_PROCESSES', 2))
+
+# The pool is made on first use in each process rather than at import: with
+# preload_app the import happens in the gunicorn master, and a pool created
+# there would be inherited, pipes and call ids included, by every worker.
+# Its processes are spawned, not forked from a worker with live threads.
+_solver_pool = None
+_solver_pool_pid = None
+_solver_pool_lock = threading.Lock()
+
+def _get_solver_pool(broken=None):
+    # pass the pool whose submit raised BrokenProcessPool (a solver process died) to replace it;
+    # a concurrent caller may have replaced it already
+    global _solver_pool, _solver_pool_pid
+    with _solver_pool_lock:
+        if _solver_pool_pid != os.getpid() or (broken is not None and _solver_pool is broken):
+            _solver_pool = ProcessPoolExecutor(max_workers=SOLVER_PROCESSES,
+                                               mp_context=multiprocessing.get_context('spawn'))
+            _solver_pool_pid = os.getpid()
+        return _solver_pool
+
+def _job_path(job_id):
+    return os.path.join(JOB_DIR, job_id + '.json')
+
+# complex numbers are stored as {"__complex__": [re, im]}, IterLogs as {"__iterlog__": columns}
+def _encode_complex(v):
+    if isinstance(v, complex):
+        return {'__complex__': [v.real, v.imag]}
+    if isinstance(v, IterLog):
+        return {'__iterlog__': v.to_dict()}
+    raise TypeError(f"Object of type {type(v).__name__} is not JSON serializable")
+
+def _decode_complex(d):
+    if '__complex__' in d:
+        return complex(*d['__complex__'])
+    if '__iterlog__' in d:
+        return IterLog.from_dict(d['__iterlog__'])
+    return d
+
+def _write_job(job_id, state):
+    os.makedirs(JOB_DIR, exist_ok=True)
+    path = _job_path(job_id)
+    with open(path + '.tmp', 'w') as fh:
+        json.dump(state, fh, default=_encode_complex)
+    os.replace(path + '.tmp', path)
+
+def _expire_jobs():
+    cutoff = time.time() - JOB_TTL
+    try:
+        entries = list(os.scandir(JOB_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass  # collected or expired by another worker meanwhile
+
+def _finish_job(job_id, future):
+    try:
+        result, error = future.result()
+    except Exception as e:
+        result, error = None, str(e)
+    _write_job(job_id, {'status': 'done', 'result': result, 'error': error})
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     result = None
     error = None
     if request.method == 'POST':
-        func_str = request.form.get('function')
-        method = request.form.get('method')
-        tol = float(request.form.get('tolerance') or 1e-8)
-        maxit = int(request.form.get('maxit') or 50)
-        try:
-            expr, f = parse_function(func_str)
-            if method in ['bisection', 'regulafalsi']:
-                a = float(request.form.get('a'))
-                b = float(request.form.get('b'))
-                if method == 'bisection':
-                    iters, root, froot, its = bisection_list(f, a, b, tol, maxit)
-                else:
-                    iters, root, froot, its = regula_falsi_list(f, a, b, tol, maxit)
-            elif method == 'secant':
-                x0 = float(request.form.get('x0'))
-                x1 = float(request.form.get('x1'))
-                iters, root, froot, its = secant_list(f, x0, x1, tol, maxit)
-            elif method == 'newton':
-                x0 = float(request.form.get('x0'))
-                df_expr = diff(expr, x)
-                df = lambdify(x, df_expr, 'numpy')
-                iters, root, froot, its = newton_list(f, df, x0, tol, maxit)
-            elif method == 'fixed':
-                g_str = request.form.get('gfunction')
-                g_expr, g = parse_function(g_str)
-                x0 = float(request.form.get('x0'))
-                iters, root, froot, its = fixed_point_list(g, x0, tol, maxit)
-            elif method == 'modified_secant':
-                x0 = float(request.form.get('x0'))
-                delta = float(request.form.get('delta') or 1e-3)
-                iters, root, froot, its = modified_secant_list(f, x0, delta, tol, maxit)
-            else:
-                raise ValueError("Unknown method")
-            result = {
-                'iters': iters,
-                'root': root,
-                'froot': froot,
-                'its': its,
-                'function': func_str,
-                'method': method
-            }
-        except Exception as e:
-            error = str(e)
+        result, error = run_solver(request.form.to_dict())
     return render_template('index.html', result=result, error=error)
 
+@app.route('/solve', methods=['POST'])
+def solve():
+    _expire_jobs()
+    job_id = uuid.uuid4().hex
+    _write_job(job_id, {'status': 'pending'})
+    pool = _get_solver_pool()
+    try:
+        future = pool.submit(run_solver, request.form.to_dict())
+    except BrokenProcessPool:
+        pool.shutdown(wait=False)
+        future = _get_solver_pool(broken=pool).submit(run_solver, request.form.to_dict())
+    future.add_done_callback(lambda fut: _finish_job(job_id, fut))
+    return jsonify({'job_id': job_id, 'result_url': url_for('job_result', job_id=job_id)}), 202
+
+@app.route('/result/<job_id>')
+def job_result(job_id):
+    if not re.fullmatch(r'[0-9a-f]{32}', job_id) or not os.path.exists(_job_path(job_id)):
+        return jsonify({'error': 'Unknown job'}), 404
+    with open(_job_path(job_id)) as fh:
+        state = json.load(fh, object_hook=_decode_complex)
+    if state['status'] == 'pending':
+        return jsonify({'status': 'pending'}), 202
+    try:
+        os.remove(_job_path(job_id))
+    except FileNotFoundError:
+        pass  # a concurrent poll already collected it
+    html = render_template('_result.html', result=state['result'], error=state['error'])
+    return jsonify({'status': 'done', 'html': html})
+
+def _solve_batch(solver, f, a, b, tol, maxit, dtype=np.float32, xp=np):
+    a = np.array(a, dtype=float, ndmin=1)
+    b = np.array(b, dtype=float, ndmin=1)
+    if xp is not np:
+        # the device takes the whole batch at once; copy in, solve, copy back
+        out = _solve_promoting(solver, f, xp.asarray(a), xp.asarray(b), tol, maxit, dtype, xp)
+        return tuple(xp.asnumpy(v) for v in out)
+    if a.size <= BATCH_CHUNK:
+        return _solve_promoting(solver, f, a, b, tol, maxit, dtype)
+    starts = range(0, a.size, BATCH_CHUNK)
+    parts = list(_batch_pool.map(
+        lambda i: _solve_promoting(solver, f, a[i:i+BATCH_CHUNK], b[i:i+BATCH_CHUNK],
+                                   tol, maxit, dtype), starts))
+    return tuple(np.concatenate(cols) for cols in zip(*parts))
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    # JSON body: {"function": ..., "method": "chandrupatla"|"bisection"|"regulafalsi",
+    #             "a": [...], "b": [...], "tolerance": ..., "maxit": ...,
+    #             "dtype": "float32"|"float64"}
+    data = request.get_json(force=True)
+    try:
+        expr, f_scalar, f = _compile(data['function'])
+        tol = float(data.get('tolerance') or 1e-8)
+        maxit = int(data.get('maxit') or 50)
+        method = data.get('method', 'chandrupatla')
+        dtype = data.get('dtype', 'float32')
+        if dtype not in ('float32', 'float64'):
+            raise ValueError("dtype must be float32 or float64")
+        if method == 'chandrupatla':
+            solver = chandrupatla_vec
+        elif method == 'bisection':
+            solver = bisection_vec
+        elif method == 'regulafalsi':
+            solver = regula_falsi_vec
+        else:
+            raise ValueError("Unknown method")
+        roots = None
+        if HAVE_CUPY and len(data['a']) > GPU_BATCH_MIN and _have_gpu():
+            try:
+                roots, froots, its = _solve_batch(solver, _compile_cupy(data['function']), data['a'], data['b'],
+                                                  tol, maxit, dtype, cupy)
+            except Exception:
+                # driver, out-of-memory or codegen trouble on the device: solve on the CPU
+                # instead (input errors such as a missing sign change are raised there again)
+                roots = None
+        if roots is None:
+            roots, froots, its = _solve_batch(solver, f, data['a'], data['b'], tol, maxit, dtype)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'roots': roots.tolist(),
+        'froots': froots.tolist(),
+        'its': its.tolist(),
+        'function': data['function'],
+        'method': method
+    })
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    # local development only; deploy with gunicorn (see gunicorn.conf.py)
+    app.run(threaded=True)
@@ -0,0 +1,11 @@
+# gunicorn settings for the ZOF web app, picked up automatically by
+#     gunicorn app:app
+import multiprocessing
+import os
+
+bind = "0.0.0.0:" + os.environ.get("PORT", "8000")
+workers = multiprocessing.cpu_count()
+worker_class = "sync"
+# import app.py (sympy, numpy, numba) once in the master; the forked
+# workers then share those pages copy-on-write instead of each importing them
+preload_app = True
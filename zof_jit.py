@@ -0,0 +1,489 @@
+"""
+zof_jit.py
+Numba-compiled iteration kernels shared by ZOF_CLI.py and app.py.
+Kernels do no printing; they fill preallocated arrays of (x_k, f(x_k), error, extra)
+and the callers format the rows afterwards.
+Without numba (or for an expression numba cannot compile) the same kernels run as plain Python.
+Compiled kernels and expression functions are cached on disk, so a restarted process loads
+them instead of compiling again; ZOF_JIT_CACHE sets where the expression modules go.
+"""
+
+import os
+import sys
+import math
+import hashlib
+import tempfile
+import importlib.util
+from tokenize import TokenError
+from functools import lru_cache
+import numpy as np
+import sympy
+from sympy import sstr, Symbol, lambdify, diff, cse, numbered_symbols, Poly
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, convert_xor
+
+try:
+    from numba import njit, cfunc
+    from numba.extending import is_jitted
+    from numba.core.ccallback import CFunc
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+    def cfunc(*args, **kwargs):
+        return lambda fn: fn
+
+    def is_jitted(fn):
+        return False
+
+    class CFunc:
+        pass
+
+x = Symbol('x')
+
+# the only names an input expression may use; anything else parses as a stray symbol
+_ALLOWED_NAMES = {name: getattr(sympy, name) for name in (
+    'sin', 'cos', 'tan', 'cot', 'sec', 'csc', 'asin', 'acos', 'atan',
+    'sinh', 'cosh', 'tanh', 'asinh', 'acosh', 'atanh',
+    'exp', 'log', 'sqrt', 'Abs', 'floor', 'ceiling', 'pi', 'E', 'I')}
+_ALLOWED_NAMES.update(x=x, ln=sympy.log, abs=sympy.Abs)
+# what the standard transformations themselves emit; no builtins
+_PARSER_GLOBALS = {'Integer': sympy.Integer, 'Float': sympy.Float, 'Rational': sympy.Rational,
+                   'Symbol': Symbol, 'factorial': sympy.factorial, '__builtins__': {}}
+_TRANSFORMATIONS = standard_transformations + (convert_xor,)
+
+def parse_expression(expr_str):
+    """Parse user input into a sympy expression in x, with ^ read as a power.
+    Unlike sympify, names are limited to a whitelist of functions and constants,
+    there are no builtins, and dunder attributes are refused outright."""
+    if '__' in expr_str:
+        raise ValueError("Invalid expression.")
+    try:
+        expr = parse_expr(expr_str, local_dict=dict(_ALLOWED_NAMES), global_dict=dict(_PARSER_GLOBALS),
+                          transformations=_TRANSFORMATIONS)
+    except (SyntaxError, TokenError, NameError, TypeError) as e:
+        # a NameError here means a call to a function outside the whitelist
+        raise ValueError("Invalid expression.") from e
+    if not isinstance(expr, sympy.Expr):
+        raise ValueError("Invalid expression.")
+    unknown = expr.free_symbols - {x}
+    if unknown:
+        raise ValueError("Unknown name(s): " + ", ".join(sorted(map(str, unknown))))
+    return expr
+
+# the kernels allocate their logs for maxit rows up front, so the callers cap it
+MAX_ITERATIONS = 100000
+
+# fastmath minus 'reassoc' (which may fold rounding guards like xi + h != xi)
+# and minus 'nnan'/'ninf' (NaN and inf must still propagate to the callers)
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn'}
+
+# generated expression modules; __pycache__ is already ignored by git
+_CACHE_DIR = os.environ.get('ZOF_JIT_CACHE', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '__pycache__', 'zof_exprs'))
+# most expression modules kept on disk; expressions come from web input
+_CACHE_MAX = int(os.environ.get('ZOF_JIT_CACHE_MAX', 256))
+
+# names sstr() emits for the common elementary functions
+_MATH_NAMES = {
+    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+    'asin': math.asin, 'acos': math.acos, 'atan': math.atan,
+    'sinh': math.sinh, 'cosh': math.cosh, 'tanh': math.tanh,
+    'exp': math.exp, 'log': math.log, 'sqrt': math.sqrt,
+    'Abs': abs, 'floor': math.floor, 'ceiling': math.ceil,
+    'pi': math.pi, 'E': math.e,
+}
+
+def _function_source(exprs):
+    """Body of a Python function of x returning exprs, with common subexpressions as locals."""
+    subs, reduced = cse(exprs, symbols=numbered_symbols('_t'))
+    lines = [f"    {sstr(s)} = {sstr(e)}" for s, e in subs]
+    lines.append("    return " + ", ".join(sstr(e) for e in reduced))
+    return "\n".join(lines)
+
+@lru_cache(maxsize=512)
+def _compile_source(src, nout=1, dtype='float64', head=''):
+    """Compile a function of x with body src into a cfunc taking and returning dtype.
+    head holds module-level definitions the body refers to, such as constant arrays.
+
+    Kernels see a cfunc as a plain function-pointer type, so one compiled kernel serves every
+    expression and is reused from numba's disk cache after a restart. The source goes into a
+    module named by its hash, so the expression function is cached on disk as well.
+    A cfunc cannot raise, so it uses numpy's error model: division by zero gives inf or nan
+    (which the solvers report) rather than an ignored exception and a 0.0 result."""
+    sig = f'{dtype}({dtype})' if nout == 1 else f'UniTuple({dtype}, {nout})({dtype})'
+    body = f"{head}def _f(x):\n{src}\n"
+    code = ("import numpy as np\n"
+            "from zof_jit import cfunc, poly3, _MATH_NAMES, _FASTMATH\n"
+            "globals().update(_MATH_NAMES)\n\n"
+            f"@cfunc({sig!r}, cache=True, fastmath=_FASTMATH, error_model='numpy')\n{body}")
+    name = "zof_expr_" + hashlib.sha1(code.encode()).hexdigest()[:20]
+    path = os.path.join(_CACHE_DIR, name + ".py")
+    try:
+        if not os.path.exists(path):
+            # write-then-rename so a concurrent worker never imports half a file; an existing
+            # file is never rewritten, since a new mtime would invalidate numba's cache
+            os.makedirs(_CACHE_DIR, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=_CACHE_DIR, suffix='.tmp')
+            with os.fdopen(fd, 'w') as fh:
+                fh.write(code)
+            os.replace(tmp, path)
+            _prune_cache()
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        # registered only while numba compiles or loads _f from its cache, which look the
+        # module up by name; left in sys.modules, every expression ever seen would stay loaded
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            del sys.modules[name]
+        return module._f
+    except OSError:
+        # no writable cache directory: compile in memory for this process only
+        ns = dict(_MATH_NAMES, poly3=poly3, np=np)
+        exec(body, ns)
+        return cfunc(sig, fastmath=_FASTMATH, error_model='numpy')(ns['_f'])
+
+def _prune_cache():
+    """Drop the oldest expression modules, with their numba cache files, beyond _CACHE_MAX."""
+    modules = []
+    for entry in os.scandir(_CACHE_DIR):
+        if entry.name.endswith('.py'):
+            try:
+                modules.append((entry.stat().st_mtime, entry.name[:-3]))
+            except FileNotFoundError:
+                pass  # pruned by another process meanwhile
+    modules.sort()
+    numba_dir = os.path.join(_CACHE_DIR, '__pycache__')
+    for _, name in modules[:max(0, len(modules) - _CACHE_MAX)]:
+        paths = [os.path.join(_CACHE_DIR, name + '.py')]
+        if os.path.isdir(numba_dir):
+            paths += [os.path.join(numba_dir, f) for f in os.listdir(numba_dir) if f.startswith(name + '.')]
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def scalar_function(expr):
+    """lambdify to the math module for float-in/float-out calls, or numpy if math lacks a function.
+    A list of expressions gives one function returning all of them, sharing common subexpressions.
+    Where math raises instead of returning (sqrt(-1), log(0), exp(1000), 1/0) the point is
+    evaluated again with numpy, so the result is nan or a signed inf as before."""
+    f = lambdify(x, expr, 'math', cse=True)
+    f_np = lambdify(x, expr, 'numpy', cse=True)
+    try:
+        f(0.5)
+    except NameError:
+        return f_np
+    except Exception:
+        # domain errors and the like only mean 0.5 is a bad sample point
+        pass
+    many = isinstance(expr, (list, tuple))
+
+    def f_checked(v):
+        try:
+            return f(v)
+        except (ValueError, OverflowError, ZeroDivisionError):
+            with np.errstate(all='ignore'):
+                r = f_np(np.float64(v))
+            return tuple(float(e) for e in r) if many else float(r)
+    return f_checked
+
+def jit_function(expr):
+    """Return a numba-compiled f(x) for a sympy expression, or a scalar lambdified one if that fails."""
+    if HAVE_NUMBA:
+        try:
+            return _compile_source(_function_source([expr]))
+        except Exception:
+            pass
+    return scalar_function(expr)
+
+@njit(cache=True, boundscheck=False, fastmath=_FASTMATH)
+def poly3(coeffs, x):
+    # Horner's rule run three times in step: p is f, d is f' and dd is f''/2,
+    # each level fed by the one below; coefficients are highest degree first
+    p = d = dd = 0.0*x
+    for a in coeffs:
+        dd = dd*x + d
+        d = d*x + p
+        p = p*x + a
+    return p, d, 2.0*dd
+
+def _poly_source(expr, order):
+    """(head, body) computing (f, f') or (f, f', f'') of a real polynomial by poly3, or None if expr is not one.
+    The coefficients are a float64 array in head, so one compiled poly3 serves every degree."""
+    if not expr.is_polynomial(x) or expr.free_symbols - {x}:
+        return None
+    coeffs = Poly(expr, x).all_coeffs()
+    if not all(c.is_real for c in coeffs):
+        return None
+    head = "_coeffs = np.array([" + ", ".join(repr(float(c)) for c in coeffs) + "])\n\n"
+    if order == 1:
+        return head, "    p, d, dd = poly3(_coeffs, x)\n    return p, d"
+    return head, "    return poly3(_coeffs, x)"
+
+def jit_derivatives(expr, order, complex_roots=False):
+    """Return one compiled callable giving (f, f', ..., f^(order)) at x, e.g. for Newton or Halley.
+    Real polynomials (order 1 or 2) go through a Horner scheme, for real or complex x; otherwise
+    complex_roots=True gives a numpy lambdify instead, which accepts complex x."""
+    if order <= 2:
+        poly = _poly_source(expr, order)
+        if poly is not None:
+            head, src = poly
+            try:
+                return _compile_source(src, order + 1, 'complex128' if complex_roots else 'float64', head)
+            except Exception:
+                pass
+    exprs = [expr]
+    for _ in range(order):
+        exprs.append(diff(exprs[-1], x))
+    if complex_roots:
+        return lambdify(x, exprs, 'numpy', cse=True)
+    if HAVE_NUMBA:
+        try:
+            return _compile_source(_function_source(exprs), len(exprs))
+        except Exception:
+            pass
+    return scalar_function(exprs)
+
+def run_kernel(kernel, *args):
+    """Run a kernel compiled when every callable argument is jitted, else as plain Python."""
+    if HAVE_NUMBA and all(is_jitted(a) or isinstance(a, CFunc) for a in args if callable(a)):
+        return kernel(*args)
+    return getattr(kernel, 'py_func', kernel)(*args)
+
+@njit(cache=True, boundscheck=False, fastmath=_FASTMATH)
+def newton_kernel(fd, x0, tol, maxit):
+    # fd(x) returns (f(x), f'(x)) from one call; a complex x0 (with a complex-capable
+    # fd) searches for complex roots, so the logs take x0's type
+    xs = np.zeros(maxit) * x0
+    fxs = np.zeros(maxit) * x0
+    errs = np.empty(maxit)
+    dfs = np.zeros(maxit) * x0
+    xi = x0
+    fxi, dfxi = fd(xi)
+    for k in range(maxit):
+        if dfxi == 0:
+            raise ZeroDivisionError("Zero derivative encountered in Newton-Raphson.")
+        x_next = xi - fxi/dfxi
+        fxn, dfxn = fd(x_next)
+        err = abs(x_next - xi)
+        xs[k], fxs[k], errs[k], dfs[k] = x_next, fxn, err, dfxi
+        if err < tol or abs(fxn) < tol:
+            return xs, fxs, errs, dfs, k+1
+        xi, fxi, dfxi = x_next, fxn, dfxn
+    return xs, fxs, errs, dfs, maxit
+
+@njit(cache=True, boundscheck=False, fastmath=_FASTMATH)
+def secant_kernel(f, x0, x1, tol, maxit):
+    xs = np.empty(maxit)
+    fxs = np.empty(maxit)
+    errs = np.empty(maxit)
+    f0, f1 = f(x0), f(x1)
+    for k in range(maxit):
+        if (f1 - f0) == 0:
+            raise ZeroDivisionError("Division by zero in Secant method.")
+        x2 = x1 - f1*(x1-x0)/(f1 - f0)
+        err = math.fabs(x2 - x1)
+        fx2 = f(x2)
+        xs[k], fxs[k], errs[k] = x2, fx2, err
+        if err < tol or abs(fx2) < tol:
+            return xs, fxs, errs, k+1
+        x0, f0 = x1, f1
+        x1, f1 = x2, fx2
+    return xs, fxs, errs, maxit
+
+@njit(cache=True, boundscheck=False, fastmath=_FASTMATH)
+def fixed_point_kernel(g, x0, tol, maxit):
+    xs = np.empty(maxit)
+    gxs = np.empty(maxit)
+    errs = np.empty(maxit)
+    xi = x0
+    x_next = g(xi)
+    for k in range(maxit):
+        err = abs(x_next - xi)
+        # g(x_next) is both the logged value and the next iterate
+        gx = g(x_next)
+        xs[k], gxs[k], errs[k] = x_next, gx, err
+        if err < tol:
+            return xs, gxs, errs, k+1
+        xi, x_next = x_next, gx
+    return xs, gxs, errs, maxit
+
+@njit(cache=True, boundscheck=False, fastmath=_FASTMATH)
+def modified_secant_kernel(f, x0, delta, tol, maxit, central=False):
+    # f'(xi) from a forward difference over h (2 f calls per step), or with
+    # central=True from (f(xi+h) - f(xi-h)) / 2h: one more call per step but a
+    # second-order estimate, which pays off for large delta. h is delta*x0; if
+    # it is lost in xi's rounding (xi far larger than x0, or delta below float
+    # resolution) it is rescaled to delta*xi, and to at least a few ulps of xi.
+    xs = np.empty(maxit)
+    fxs = np.empty(maxit)
+    errs = np.empty(maxit)
+    perturb = x0 * delta if x0 != 0 else delta
+    xi = x0
+    fxi = f(xi)
+    for k in range(maxit):
+        if xi + perturb == xi or xi - perturb == xi:
+            perturb = max(abs(delta*xi), 4*np.finfo(np.float64).eps*abs(xi))
+        if central:
+            denom = f(xi + perturb) - f(xi - perturb)
+            step = 2*perturb
+        else:
+            denom = f(xi + perturb) - fxi
+            step = perturb
+        if denom == 0:
+            raise ZeroDivisionError("Denominator zero in Modified Secant.")
+        x_next = xi - fxi * step / denom
+        fxn = f(x_next)
+        err = abs(x_next - xi)
+        xs[k], fxs[k], errs[k] = x_next, fxn, err
+        if err < tol or abs(fxn) < tol:
+            return xs, fxs, errs, k+1
+        xi, fxi = x_next, fxn
+    return xs, fxs, errs, maxit
+
+@njit(cache=True, boundscheck=False, fastmath=_FASTMATH)
+def halley_kernel(fdd, x0, tol, maxit):
+    # fdd(x) returns (f(x), f'(x), f''(x)) from one call; complex x0 works as in newton_kernel
+    xs = np.zeros(maxit) * x0
+    fxs = np.zeros(maxit) * x0
+    errs = np.empty(maxit)
+    dfs = np.zeros(maxit) * x0
+    xi = x0
+    fxi, dfxi, d2fxi = fdd(xi)
+    for k in range(maxit):
+        if dfxi == 0:
+            raise ZeroDivisionError("Zero derivative encountered in Halley's method.")
+        # take the Halley correction only while it stays well away from a pole,
+        # otherwise fall back to a plain Newton step
+        if abs(1 - 0.5*fxi*d2fxi/(dfxi*dfxi)) > 0.5:
+            x_next = xi - (2*fxi*dfxi) / (2*dfxi*dfxi - fxi*d2fxi)
+        else:
+            x_next = xi - fxi/dfxi
+        fxn, dfxn, d2fxn = fdd(x_next)
+        err = abs(x_next - xi)
+        xs[k], fxs[k], errs[k], dfs[k] = x_next, fxn, err, dfxi
+        if err < tol or abs(fxn) < tol:
+            return xs, fxs, errs, dfs, k+1
+        xi, fxi, dfxi, d2fxi = x_next, fxn, dfxn, d2fxn
+    return xs, fxs, errs, dfs, maxit
+
+@njit(cache=True, boundscheck=False, fastmath=_FASTMATH)
+def halley_fixed_kernel(fdd, x0):
+    # three Halley steps and a closing Newton step, no convergence tests;
+    # only meant for well-behaved f with a good starting point
+    xs = np.zeros(4) * x0
+    fxs = np.zeros(4) * x0
+    errs = np.empty(4)
+    xi = x0
+    fxi, dfxi, d2fxi = fdd(xi)
+    for k in range(4):
+        if k < 3:
+            x_next = xi - (2*fxi*dfxi) / (2*dfxi*dfxi - fxi*d2fxi)
+        else:
+            x_next = xi - fxi/dfxi
+        fxn, dfxn, d2fxn = fdd(x_next)
+        xs[k], fxs[k], errs[k] = x_next, fxn, abs(x_next - xi)
+        xi, fxi, dfxi, d2fxi = x_next, fxn, dfxn, d2fxn
+    return xs, fxs, errs
+
+@njit(cache=True, boundscheck=False, fastmath=_FASTMATH)
+def steffensen_kernel(g, x0, tol, maxit):
+    # Aitken's delta-squared applied to each pair of fixed-point steps
+    xs = np.empty(maxit)
+    gxs = np.empty(maxit)
+    errs = np.empty(maxit)
+    xi = x0
+    x1 = g(xi)
+    for k in range(maxit):
+        x2 = g(x1)
+        denom = x2 - 2*x1 + xi
+        if abs(denom) < 1e-14:
+            x_next = x2
+        else:
+            x_next = xi - (x1 - xi)**2 / denom
+        err = abs(x_next - xi)
+        # g(x_next) is both the logged value and the first step of the next cycle
+        x1 = g(x_next)
+        xs[k], gxs[k], errs[k] = x_next, x1, err
+        if err < tol:
+            return xs, gxs, errs, k+1
+        xi = x_next
+    return xs, gxs, errs, maxit
+
+@njit(cache=True, boundscheck=False, fastmath=_FASTMATH)
+def brent_kernel(f, a, b, tol, maxit):
+    # Brent's method as in scipy's brentq.c: inverse quadratic interpolation or
+    # secant steps when they stay well inside the bracket, bisection otherwise.
+    # steps[k] records what was taken: 0 bisection, 1 secant, 2 inverse quadratic.
+    # The root is returned separately: on convergence it is the better end of
+    # the final bracket, which need not be the last point evaluated.
+    xs = np.empty(maxit)
+    fxs = np.empty(maxit)
+    errs = np.empty(maxit)
+    steps = np.empty(maxit, dtype=np.int64)
+    rtol = 4*np.finfo(np.float64).eps
+    xpre, xcur = a, b
+    fpre, fcur = f(a), f(b)
+    # a NaN would get past the sign test below and be swapped for the unset xblk, fblk;
+    # an infinite value still has a sign, and only forces bisection steps below
+    if fpre != fpre or fcur != fcur:
+        raise ValueError("Function returned NaN on interval endpoints.")
+    if fpre*fcur > 0:
+        raise ValueError("f(a) and f(b) must have opposite signs for Brent's method.")
+    if fpre == 0 or fcur == 0:
+        if fpre == 0:
+            xcur, fcur = xpre, fpre
+        if maxit == 0:
+            return xs, fxs, errs, steps, 0, xcur, fcur
+        xs[0], fxs[0], errs[0], steps[0] = xcur, fcur, 0.0, 0
+        return xs, fxs, errs, steps, 1, xcur, fcur
+    xblk, fblk = 0.0, 0.0
+    spre, scur = 0.0, 0.0
+    for k in range(maxit):
+        if fpre != 0 and fcur != 0 and (fpre < 0) != (fcur < 0):
+            xblk, fblk = xpre, fpre
+            spre = scur = xcur - xpre
+        if abs(fblk) < abs(fcur):
+            xpre, xcur, xblk = xcur, xblk, xcur
+            fpre, fcur, fblk = fcur, fblk, fcur
+        delta = (tol + rtol*abs(xcur))/2
+        sbis = (xblk - xcur)/2
+        if fcur == 0 or abs(sbis) < delta:
+            if k == 0:
+                xs[0], fxs[0], errs[0], steps[0] = xcur, fcur, abs(sbis), 0
+                return xs, fxs, errs, steps, 1, xcur, fcur
+            return xs, fxs, errs, steps, k, xcur, fcur
+        step = 0
+        finite = math.isfinite(fcur) and math.isfinite(fpre) and math.isfinite(fblk)
+        if finite and abs(spre) > delta and abs(fcur) < abs(fpre):
+            if xpre == xblk:
+                stry = -fcur*(xcur - xpre)/(fcur - fpre)
+                step = 1
+            else:
+                dpre = (fpre - fcur)/(xpre - xcur)
+                dblk = (fblk - fcur)/(xblk - xcur)
+                stry = -fcur*(fblk*dblk - fpre*dpre)/(dblk*dpre*(fblk - fpre))
+                step = 2
+            if 2*abs(stry) < min(abs(spre), 3*abs(sbis) - delta):
+                spre, scur = scur, stry
+            else:
+                spre = scur = sbis
+                step = 0
+        else:
+            spre = scur = sbis
+        xpre, fpre = xcur, fcur
+        if abs(scur) > delta:
+            xcur += scur
+        else:
+            xcur += delta if sbis > 0 else -delta
+        fcur = f(xcur)
+        xs[k], fxs[k], errs[k], steps[k] = xcur, fcur, abs(sbis), step
+    return xs, fxs, errs, steps, maxit, xcur, fcur